@@ -7,6 +7,9 @@ from flask_login import LoginManager
 
 from .config import Config
 from .database import db
+from .admission import admission
+from .cache import project_list_cache
+from .activity import activity_log
 
 # Flask-Login setup
 login_manager = LoginManager()
@@ -28,6 +31,9 @@ def create_app():
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
+    admission.init_app(app)
+    project_list_cache.init_app(app)
+    activity_log.init_app(app)
 
     # CORS: allow our React dev server + include credentials,
     # and explicitly allow the methods we need (including DELETE & OPTIONS).
@@ -46,13 +52,18 @@ def create_app():
     from .auth import auth_bp
     from .projects import projects_bp
     from .tasks import tasks_bp
+    from .admission import admission_bp
 
     app.register_blueprint(auth_bp,    url_prefix='/auth')
     app.register_blueprint(projects_bp, url_prefix='/api/projects')
     app.register_blueprint(tasks_bp,    url_prefix='/api')
+    app.register_blueprint(admission_bp, url_prefix='/api/admission')
 
-    # Create tables (and apply any new migrations you’ve run)
-    with app.app_context():
-        db.create_all()
+    # Create tables (and apply any new migrations you’ve run).
+    # Under gunicorn.conf.py's preload mode this runs once in the master;
+    # forked workers inherit the ready app and never repeat it.
+    if not app.config['SKIP_SCHEMA_CHECK']:
+        with app.app_context():
+            db.create_all()
 
     return app
@@ -0,0 +1,142 @@
+# app/activity.py
+
+import os
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from .database import db
+from .models import TaskActivity
+
+log = logging.getLogger(__name__)
+
+# Task fields whose changes end up in the activity feed
+TRACKED_FIELDS = ('status', 'assignee_id', 'due_date', 'tags')
+
+
+def snapshot(task):
+    """Captures the tracked fields of a task as strings (None when unset)."""
+    return {
+        'status': task.status,
+        'assignee_id': str(task.assignee_id) if task.assignee_id is not None else None,
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+        'tags': ','.join(sorted(tag.name for tag in task.tags)) or None,
+    }
+
+
+class ActivityLog:
+    """
+    Write-behind buffer for task activity.
+
+    Request handlers only append to an in-memory list; a background thread
+    in each worker writes the buffer out as one multi-row INSERT once it
+    holds ACTIVITY_FLUSH_SIZE entries or ACTIVITY_FLUSH_INTERVAL seconds have
+    passed, and whatever is left is written at interpreter shutdown.
+    Entries still buffered when a worker is killed hard are lost.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.flush_size = 100
+        self.flush_interval = 2.0
+        self._buffer = []
+        self._lock = threading.Lock()
+        # Held from taking a batch until it commits, so batches land in the
+        # order they were taken and ids (which the feed sorts by) stay in
+        # event order.
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_size = app.config.get('ACTIVITY_FLUSH_SIZE', 100)
+        self.flush_interval = app.config.get('ACTIVITY_FLUSH_INTERVAL', 2.0)
+        app.extensions['activity_log'] = self
+        atexit.register(self.flush)
+
+    # ── Recording ─────────────────────────────────────────────────
+    def record(self, task, before, user_id):
+        """
+        Buffers one entry per tracked field that differs from `before`.
+        Pass before=None for a newly created task. Call after commit so
+        rolled-back changes never reach the log.
+        """
+        if task.project_id is None:
+            return
+        after = snapshot(task)
+        now = datetime.utcnow()
+        entries = [
+            {
+                'project_id': task.project_id,
+                'task_id': task.id,
+                'user_id': user_id,
+                'field': field,
+                'old_value': before[field] if before else None,
+                'new_value': after[field],
+                'created_at': now,
+            }
+            for field in TRACKED_FIELDS
+            if (before[field] if before else None) != after[field]
+        ]
+        if not entries:
+            return
+
+        self._ensure_flusher()
+        with self._lock:
+            self._buffer.extend(entries)
+            full = len(self._buffer) >= self.flush_size
+        if full:
+            self._wakeup.set()
+
+    # ── Flushing ──────────────────────────────────────────────────
+    def _ensure_flusher(self):
+        # Threads do not survive a fork, so each worker starts its own.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wakeup = threading.Event()
+            threading.Thread(target=self._run, name='activity-flusher', daemon=True).start()
+
+    def _run(self):
+        wakeup = self._wakeup
+        while True:
+            wakeup.wait(self.flush_interval)
+            wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered entries as multi-row INSERTs of up to flush_size rows."""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        if not pending or self.app is None:
+            return
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    for i in range(0, len(pending), self.flush_size):
+                        chunk = pending[i:i + self.flush_size]
+                        conn.execute(db.insert(TaskActivity).values(chunk))
+        except Exception:
+            log.exception('could not write %d activity entries, re-queueing', len(pending))
+            with self._lock:
+                self._buffer[:0] = pending
+                # Give up on the oldest entries rather than grow without bound.
+                overflow = len(self._buffer) - 10 * self.flush_size
+                if overflow > 0:
+                    del self._buffer[:overflow]
+            if overflow > 0:
+                log.error('dropped %d activity entries', overflow)
+
+
+activity_log = ActivityLog()
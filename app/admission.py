@@ -0,0 +1,244 @@
+# app/admission.py
+
+import math
+import time
+import sqlite3
+import logging
+import threading
+from functools import wraps
+
+from flask import Blueprint, jsonify, current_app
+from flask_login import login_required, current_user
+
+from .localstore import LocalStore
+
+log = logging.getLogger(__name__)
+
+admission_bp = Blueprint('admission_bp', __name__)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS buckets (
+        key     TEXT PRIMARY KEY,
+        tokens  REAL NOT NULL,
+        updated REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS leases (
+        id       INTEGER PRIMARY KEY AUTOINCREMENT,
+        endpoint TEXT NOT NULL,
+        expires  REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_leases_endpoint ON leases (endpoint, expires);
+    CREATE TABLE IF NOT EXISTS metrics (
+        endpoint TEXT NOT NULL,
+        outcome  TEXT NOT NULL,
+        count    INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (endpoint, outcome)
+    );
+"""
+
+
+def _is_busy(error):
+    """True for lock contention (SQLITE_BUSY / SQLITE_LOCKED) rather than a broken store."""
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return (code & 0xff) in (5, 6)
+    return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+
+class AdmissionControl:
+    """
+    Per-user token buckets plus a per-endpoint concurrency cap.
+
+    State lives in a small SQLite file next to the app database so every
+    gunicorn worker sees the same buckets, in-flight leases and counters.
+    Requests over their budget are rejected immediately (429 / 503 with
+    Retry-After) rather than queued behind the abuser.
+
+    If the store stays locked past ADMISSION_BUSY_TIMEOUT the request is shed
+    as `shed_busy`, since contention means the server is under load. Only a
+    store that is actually broken fails open, counted as `unchecked`. Both
+    are counted in memory and added to the shared metrics on the next
+    request that reaches the store.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.buckets = {}
+        self.concurrency = {}
+        self.lease_ttl = 30.0
+        self.store = LocalStore(SCHEMA)
+        self._unrecorded = {}
+        self._unrecorded_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ADMISSION_ENABLED', True)
+        self.store.configure(app.config['ADMISSION_STORE'],
+                             app.config.get('ADMISSION_BUSY_TIMEOUT'))
+        self.buckets = app.config.get('ADMISSION_BUCKETS', {})
+        self.concurrency = app.config.get('ADMISSION_CONCURRENCY', {})
+        self.lease_ttl = app.config.get('ADMISSION_LEASE_TTL', 30.0)
+        app.extensions['admission'] = self
+
+    # ── Store ─────────────────────────────────────────────────────
+    def _conn(self):
+        return self.store.conn()
+
+    def _record(self, conn, endpoint, outcome, count=1):
+        conn.execute(
+            'INSERT INTO metrics (endpoint, outcome, count) VALUES (?, ?, ?) '
+            'ON CONFLICT (endpoint, outcome) DO UPDATE SET count = count + excluded.count',
+            (endpoint, outcome, count)
+        )
+
+    def _count_unrecorded(self, endpoint, outcome):
+        # Decisions made without the store; written out once it is reachable.
+        with self._unrecorded_lock:
+            key = (endpoint, outcome)
+            self._unrecorded[key] = self._unrecorded.get(key, 0) + 1
+
+    def _record_unrecorded(self, conn):
+        with self._unrecorded_lock:
+            pending, self._unrecorded = self._unrecorded, {}
+        for (endpoint, outcome), count in pending.items():
+            self._record(conn, endpoint, outcome, count)
+        return pending
+
+    def _restore_unrecorded(self, pending):
+        with self._unrecorded_lock:
+            for key, count in pending.items():
+                self._unrecorded[key] = self._unrecorded.get(key, 0) + count
+
+    def _take_token(self, conn, endpoint, user_id, now):
+        """Returns 0 if a token was taken, else seconds until one is available."""
+        capacity, rate = self.buckets[endpoint]
+        key = f'{endpoint}:{user_id}'
+        row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+        tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+
+        wait = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        conn.execute(
+            'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+            (key, tokens, now)
+        )
+        return wait
+
+    def _take_lease(self, conn, endpoint, now):
+        """Returns a lease id, or None if the endpoint is at its concurrency cap."""
+        conn.execute('DELETE FROM leases WHERE endpoint = ? AND expires < ?', (endpoint, now))
+        (inflight,) = conn.execute('SELECT COUNT(*) FROM leases WHERE endpoint = ?', (endpoint,)).fetchone()
+        if inflight >= self.concurrency[endpoint]:
+            return None
+        cur = conn.execute('INSERT INTO leases (endpoint, expires) VALUES (?, ?)',
+                           (endpoint, now + self.lease_ttl))
+        return cur.lastrowid
+
+    def admit(self, endpoint, user_id):
+        """
+        Decides whether a request may run.
+        Returns (status, retry_after, lease_id); status is None when admitted.
+        A store that stays locked sheds the request with 503; any other store
+        failure admits it so the limiter never becomes the outage.
+        """
+        now = time.time()
+        pending = {}
+        try:
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                pending = self._record_unrecorded(conn)
+                status, retry_after, lease = None, 0, None
+                # Check the shared cap first: a request shed because the
+                # server is busy must not spend the user's own budget.
+                if endpoint in self.concurrency:
+                    lease = self._take_lease(conn, endpoint, now)
+                    if lease is None:
+                        status, retry_after = 503, 1
+                if status is None and endpoint in self.buckets:
+                    wait = self._take_token(conn, endpoint, user_id, now)
+                    if wait:
+                        status, retry_after = 429, wait
+                        if lease is not None:
+                            conn.execute('DELETE FROM leases WHERE id = ?', (lease,))
+                            lease = None
+                self._record(conn, endpoint, 'accepted' if status is None else f'shed_{status}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            self._restore_unrecorded(pending)
+            if _is_busy(e):
+                self._count_unrecorded(endpoint, 'shed_busy')
+                return 503, 1, None
+            log.warning('admission store unavailable, admitting request: %s', e)
+            self._count_unrecorded(endpoint, 'unchecked')
+            return None, 0, None
+        return status, retry_after, lease
+
+    def release(self, lease_id):
+        try:
+            self._conn().execute('DELETE FROM leases WHERE id = ?', (lease_id,))
+        except sqlite3.Error as e:
+            # The lease expires on its own after ADMISSION_LEASE_TTL.
+            log.warning('could not release admission lease %s: %s', lease_id, e)
+
+    def metrics(self):
+        """Counters by endpoint and outcome, or None if the store is unavailable."""
+        try:
+            rows = self._conn().execute('SELECT endpoint, outcome, count FROM metrics').fetchall()
+        except sqlite3.Error as e:
+            log.warning('admission store unavailable, cannot read metrics: %s', e)
+            return None
+        out = {}
+        for endpoint, outcome, count in rows:
+            out.setdefault(endpoint, {})[outcome] = count
+        return out
+
+    # ── Decorator ─────────────────────────────────────────────────
+    def limit(self, endpoint):
+        """
+        Guards a view with the bucket / concurrency settings configured for
+        `endpoint`. Place it below @login_required so current_user is known.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                status, retry_after, lease = self.admit(endpoint, current_user.id)
+                if status is not None:
+                    message = ('Too many requests, slow down.' if status == 429
+                               else 'Server busy, try again shortly.')
+                    return (jsonify({'message': message}), status,
+                            {'Retry-After': str(max(1, math.ceil(retry_after)))})
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    if lease is not None:
+                        self.release(lease)
+            return wrapped
+        return decorator
+
+
+admission = AdmissionControl()
+
+
+# ── Metrics ───────────────────────────────────────────────────────
+@admission_bp.route('/metrics', methods=['GET'])
+@login_required
+def admission_metrics():
+    """Accepted / shed request counters per endpoint class, across all workers."""
+    ext = current_app.extensions['admission']
+    metrics = ext.metrics()
+    if metrics is None:
+        return (jsonify({'message': 'Metrics temporarily unavailable.'}), 503,
+                {'Retry-After': '1'})
+    return jsonify(metrics), 200
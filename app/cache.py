@@ -0,0 +1,123 @@
+# app/cache.py
+
+import json
+import time
+import sqlite3
+import logging
+
+from .localstore import LocalStore
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+    -- Superseded by project_list_entries (which carries a created time);
+    -- drop it so cache files from before the rename don't keep it around.
+    DROP TABLE IF EXISTS project_lists;
+    CREATE TABLE IF NOT EXISTS generations (
+        user_id INTEGER PRIMARY KEY,
+        gen     INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS project_list_entries (
+        user_id INTEGER NOT NULL,
+        filter  TEXT NOT NULL,
+        gen     INTEGER NOT NULL,
+        created REAL NOT NULL,
+        body    TEXT NOT NULL,
+        PRIMARY KEY (user_id, filter)
+    );
+"""
+
+
+class ProjectListCache:
+    """
+    Per-user cache of the serialized project list, shared by all workers.
+
+    Every user has a generation counter that is bumped whenever something
+    that shows up in their list changes. An entry is only stored if the
+    generation it was computed under is still current, so a slow reader can
+    never overwrite a newer invalidation with stale data. Entries also
+    expire after PROJECT_CACHE_TTL seconds, which bounds how long a list can
+    stay stale if an invalidation is ever lost (e.g. the store was busy).
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.ttl = 60.0
+        self.store = LocalStore(SCHEMA)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROJECT_CACHE_ENABLED', True)
+        self.ttl = app.config.get('PROJECT_CACHE_TTL', 60.0)
+        self.store.configure(app.config['PROJECT_CACHE_STORE'],
+                             app.config.get('PROJECT_CACHE_BUSY_TIMEOUT'))
+        app.extensions['project_list_cache'] = self
+
+    def get(self, user_id, key):
+        """Returns (value or None, generation to pass back to put())."""
+        if not self.enabled:
+            return None, None
+        try:
+            row = self.store.conn().execute(
+                'SELECT g.gen, p.gen, p.body FROM (SELECT ? AS user_id) u '
+                'LEFT JOIN generations g ON g.user_id = u.user_id '
+                'LEFT JOIN project_list_entries p ON p.user_id = u.user_id '
+                'AND p.filter = ? AND p.created > ?',
+                (user_id, key, time.time() - self.ttl)
+            ).fetchone()
+        except sqlite3.Error as e:
+            log.warning('project list cache unavailable: %s', e)
+            return None, None
+        gen = row[0] or 0
+        if row[2] is not None and row[1] == gen:
+            return json.loads(row[2]), gen
+        return None, gen
+
+    def put(self, user_id, key, gen, value):
+        if gen is None:
+            return
+        try:
+            self.store.conn().execute(
+                'INSERT OR REPLACE INTO project_list_entries (user_id, filter, gen, created, body) '
+                'SELECT ?, ?, ?, ?, ? WHERE COALESCE((SELECT gen FROM generations WHERE user_id = ?), 0) = ?',
+                (user_id, key, gen, time.time(), json.dumps(value), user_id, gen)
+            )
+        except sqlite3.Error as e:
+            log.warning('could not cache project list for user %s: %s', user_id, e)
+
+    def invalidate(self, user_ids):
+        if not self.enabled:
+            return
+        conn = None
+        try:
+            conn = self.store.conn()
+            conn.execute('BEGIN IMMEDIATE')
+            for user_id in user_ids:
+                conn.execute(
+                    'INSERT INTO generations (user_id, gen) VALUES (?, 1) '
+                    'ON CONFLICT (user_id) DO UPDATE SET gen = gen + 1',
+                    (user_id,)
+                )
+                conn.execute('DELETE FROM project_list_entries WHERE user_id = ?', (user_id,))
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            # Stale lists are served until their entries expire, so make it loud.
+            log.error('could not invalidate project lists for %s: %s', list(user_ids), e)
+            if conn is not None and conn.in_transaction:
+                conn.execute('ROLLBACK')
+
+
+project_list_cache = ProjectListCache()
+
+
+def invalidate_project_members(project_id):
+    """Drops the cached project lists of everyone in a project. Call after commit."""
+    from .database import db
+    from .models import project_members
+
+    user_ids = db.session.execute(
+        db.select(project_members.c.user_id)
+        .where(project_members.c.project_id == project_id)
+    ).scalars().all()
+    project_list_cache.invalidate(user_ids)
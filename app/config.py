@@ -9,6 +9,45 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
                               'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'site.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Skip db.create_all() in create_app(). Set when the schema is known to be
+    # in place already, e.g. a deploy step ran it or a preloading master did.
+    SKIP_SCHEMA_CHECK = os.environ.get('SKIP_SCHEMA_CHECK') == '1'
+
+    # Admission control (see app/admission.py)
+    # Bucket / lease state is shared by all gunicorn workers through this file.
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') != '0'
+    ADMISSION_STORE = os.environ.get('ADMISSION_STORE') or \
+                      os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'admission.db')
+    # Token buckets per endpoint class: (burst capacity, refill tokens/second) per user
+    ADMISSION_BUCKETS = {
+        'users':         (10, 0.5),
+        'user_profile':  (20, 1.0),
+        'project_tasks': (30, 2.0),
+    }
+    # Max requests in flight per endpoint class across all workers
+    ADMISSION_CONCURRENCY = {
+        'users':         2,
+        'user_profile':  4,
+        'project_tasks': 6,
+    }
+    # Leases left behind by a crashed worker expire after this many seconds
+    ADMISSION_LEASE_TTL = 30.0
+    # How long a request may wait on the shared store before failing open
+    ADMISSION_BUSY_TIMEOUT = 0.05
+
+    # Per-user project list cache (see app/cache.py), shared across workers
+    PROJECT_CACHE_ENABLED = os.environ.get('PROJECT_CACHE_ENABLED', '1') != '0'
+    PROJECT_CACHE_STORE = os.environ.get('PROJECT_CACHE_STORE') or \
+                          os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'cache.db')
+    # Invalidations must land, so they may wait a little longer on the store
+    PROJECT_CACHE_BUSY_TIMEOUT = 0.5
+    # Entries expire after this many seconds even if never invalidated
+    PROJECT_CACHE_TTL = 60.0
+
+    # Task activity write-behind (see app/activity.py): flush after this many
+    # buffered entries or this many seconds, whichever comes first
+    ACTIVITY_FLUSH_SIZE = 100
+    ACTIVITY_FLUSH_INTERVAL = 2.0
 
     # Flask-Mail configuration (if you were to add email functionality)
     MAIL_SERVER = 'smtp.googlemail.com'
@@ -0,0 +1,197 @@
+# app/hierarchy.py
+
+from sqlalchemy import text
+from .database import db
+from .models import Project
+
+# Status that counts as done for roll-ups and dependency checks
+DONE_STATUS = 'completed'
+
+# The cycle checks use UNION (not UNION ALL) so they terminate even if bad
+# data ever introduced a cycle; the tree and unblocked walks need per-row
+# depth and are capped by MAX_DEPTH instead.
+
+# Everything whose readiness hangs on :start: its subtree (children
+# inherit their parent's blockers) and whatever those tasks block, closed
+# transitively over both kinds of edge.
+_DOWNSTREAM_CTE = """
+    WITH RECURSIVE downstream(id) AS (
+        SELECT :start
+        UNION
+        SELECT e.dst FROM downstream s JOIN (
+            SELECT blocker_id AS src, blocked_id AS dst FROM task_dependencies
+            UNION ALL
+            SELECT parent_id AS src, id AS dst FROM task WHERE parent_id IS NOT NULL
+        ) e ON e.src = s.id
+    )
+"""
+
+_DEPENDENCY_CYCLE_SQL = text(_DOWNSTREAM_CTE + """
+    SELECT 1 FROM downstream WHERE id = :target LIMIT 1
+""")
+
+# Moving :start under :target makes its subtree inherit the blockers of
+# :target and its ancestors; that loops if any of them (or :target itself)
+# already hangs on :start.
+_PARENT_CYCLE_SQL = text(_DOWNSTREAM_CTE + """
+    , upstream(id) AS (
+        SELECT :target
+        UNION
+        SELECT t.parent_id FROM task t JOIN upstream u ON t.id = u.id
+        WHERE t.parent_id IS NOT NULL
+    )
+    SELECT 1 FROM downstream WHERE id IN (
+        SELECT id FROM upstream
+        UNION
+        SELECT d.blocker_id FROM task_dependencies d JOIN upstream u ON d.blocked_id = u.id
+    ) LIMIT 1
+""")
+
+# One row per (node, blocker) pair; nodes without blockers come back once
+# with blocker_id NULL.
+_TREE_SQL = """
+    WITH RECURSIVE tree(id, depth) AS (
+        SELECT id, 0 FROM task WHERE project_id = :project_id AND {roots}
+        UNION ALL
+        SELECT t.id, tree.depth + 1 FROM task t JOIN tree ON t.parent_id = tree.id
+        WHERE t.project_id = :project_id AND tree.depth < :max_depth
+    )
+    SELECT t.id, t.title, t.status, t.priority, t.due_date, t.parent_id,
+           t.assignee_id, u.username AS assignee_username, tree.depth,
+           d.blocker_id
+    FROM tree
+    JOIN task t ON t.id = tree.id
+    LEFT JOIN "user" u ON u.id = t.assignee_id
+    LEFT JOIN task_dependencies d ON d.blocked_id = t.id
+    ORDER BY tree.depth, t.id
+"""
+_FOREST_SQL = text(_TREE_SQL.format(roots='parent_id IS NULL')).columns(due_date=db.DateTime)
+_SUBTREE_SQL = text(_TREE_SQL.format(roots='id = :root_id')).columns(due_date=db.DateTime)
+
+# Backstop against runaway recursion; real hierarchies are far shallower
+MAX_DEPTH = 10000
+
+# A task is blocked if it, or any of its ancestors, waits on an unfinished
+# blocker; everything else that is not done yet is ready to work on. The
+# flag is inherited top-down in a single walk, so each task is visited once.
+_UNBLOCKED_SQL = text("""
+    WITH RECURSIVE walk(id, blocked, depth) AS (
+        SELECT t.id,
+               EXISTS (SELECT 1 FROM task_dependencies d JOIN task b ON b.id = d.blocker_id
+                       WHERE d.blocked_id = t.id AND b.status != :done),
+               0
+        FROM task t WHERE t.project_id = :project_id AND t.parent_id IS NULL
+        UNION ALL
+        SELECT t.id,
+               w.blocked OR EXISTS (SELECT 1 FROM task_dependencies d JOIN task b ON b.id = d.blocker_id
+                                    WHERE d.blocked_id = t.id AND b.status != :done),
+               w.depth + 1
+        FROM task t JOIN walk w ON t.parent_id = w.id
+        WHERE t.project_id = :project_id AND w.depth < :max_depth
+    )
+    SELECT t.id, t.title, t.status, t.priority, t.parent_id, t.assignee_id
+    FROM walk
+    JOIN task t ON t.id = walk.id
+    WHERE NOT walk.blocked AND t.status != :done
+    ORDER BY t.id
+""")
+
+
+def lock_project_hierarchy(project_id):
+    """
+    Serializes hierarchy / dependency edits within a project so a cycle
+    check and the write it guards happen atomically. Call before the check;
+    the lock is held until the session commits or rolls back.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite has no row locks; take the database write lock instead.
+        # If the session already wrote something it holds that lock anyway.
+        if not db.session.connection().connection.driver_connection.in_transaction:
+            db.session.execute(text('BEGIN IMMEDIATE'))
+    else:
+        db.session.execute(
+            db.select(Project.id).where(Project.id == project_id).with_for_update()
+        )
+
+
+def creates_parent_cycle(task_id, parent_id):
+    """
+    True if making `parent_id` the parent of `task_id` would loop the
+    hierarchy, or leave the moved subtree blocked (via inheritance) by
+    something that itself waits on that subtree.
+    """
+    row = db.session.execute(_PARENT_CYCLE_SQL, {'start': task_id, 'target': parent_id}).first()
+    return row is not None
+
+
+def creates_dependency_cycle(blocker_id, blocked_id):
+    """
+    True if `blocker_id` blocking `blocked_id` would close a loop. Parent ->
+    child links count as edges, because subtasks inherit their ancestors'
+    blockers: a task blocked by its own subtask could never become ready.
+    """
+    row = db.session.execute(_DEPENDENCY_CYCLE_SQL, {'start': blocked_id, 'target': blocker_id}).first()
+    return row is not None
+
+
+def load_tree(project_id, root_id=None):
+    """
+    Loads a project's task forest (or the subtree under `root_id`) in one
+    query. Returns a flat list ordered by depth, each node carrying its
+    parent_id, depth, blockers and roll-up progress over its subtree.
+    The list is kept flat because thousands-deep nesting would overflow
+    the JSON encoder's recursion limit.
+    """
+    params = {'project_id': project_id, 'max_depth': MAX_DEPTH}
+    if root_id is None:
+        rows = db.session.execute(_FOREST_SQL, params)
+    else:
+        rows = db.session.execute(_SUBTREE_SQL, dict(params, root_id=root_id))
+
+    nodes = {}
+    for r in rows:
+        node = nodes.get(r.id)
+        if node is None:
+            node = nodes[r.id] = {
+                'id': r.id,
+                'title': r.title,
+                'status': r.status,
+                'priority': r.priority,
+                'due_date': r.due_date.isoformat() if r.due_date else None,
+                'parent_id': r.parent_id,
+                'assignee_id': r.assignee_id,
+                'assignee_username': r.assignee_username,
+                'depth': r.depth,
+                'blocked_by': [],
+                'progress': {'done': 1 if r.status == DONE_STATUS else 0, 'total': 1},
+            }
+        if r.blocker_id is not None:
+            node['blocked_by'].append(r.blocker_id)
+
+    # Rows are ordered by depth, so walking them backwards folds every
+    # child into its parent before the parent is folded further up.
+    for node in reversed(list(nodes.values())):
+        parent = nodes.get(node['parent_id'])
+        if parent is not None and node['depth'] > 0:
+            parent['progress']['done'] += node['progress']['done']
+            parent['progress']['total'] += node['progress']['total']
+
+    return list(nodes.values())
+
+
+def unblocked_tasks(project_id):
+    """Open tasks in a project with no unfinished blockers on them or their ancestors."""
+    rows = db.session.execute(_UNBLOCKED_SQL, {
+        'project_id': project_id, 'done': DONE_STATUS, 'max_depth': MAX_DEPTH,
+    })
+    return [
+        {
+            'id': r.id,
+            'title': r.title,
+            'status': r.status,
+            'priority': r.priority,
+            'parent_id': r.parent_id,
+            'assignee_id': r.assignee_id,
+        }
+        for r in rows
+    ]
@@ -0,0 +1,41 @@
+# app/localstore.py
+
+import os
+import sqlite3
+import threading
+
+
+class LocalStore:
+    """
+    A small SQLite file on local disk shared by every gunicorn worker.
+
+    Used for state that must agree across workers but does not belong in the
+    app database (rate-limit buckets, cached responses). Each thread of each
+    process gets its own connection; connections are never reused across a fork.
+    """
+
+    def __init__(self, schema, busy_timeout=0.05):
+        self.schema = schema
+        self.busy_timeout = busy_timeout
+        self.path = None
+        self._local = threading.local()
+
+    def configure(self, path, busy_timeout=None):
+        self.path = path
+        if busy_timeout is not None:
+            self.busy_timeout = busy_timeout
+        # Drop this thread's connection in case the path changed.
+        self._local = threading.local()
+
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.executescript(self.schema)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
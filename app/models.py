@@ -15,6 +15,14 @@ task_tags = db.Table('task_tags',
     db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True)
 )
 
+# Helper table for blocks / blocked-by dependencies between tasks
+# (blocker must be completed before blocked can start)
+task_dependencies = db.Table('task_dependencies',
+    db.Column('blocker_id', db.Integer, db.ForeignKey('task.id'), primary_key=True),
+    db.Column('blocked_id', db.Integer, db.ForeignKey('task.id'), primary_key=True),
+    db.Index('ix_task_dependencies_blocked', 'blocked_id')
+)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -45,6 +53,11 @@ class Project(db.Model):
         return f'<Project {self.title}, completed={self.is_completed}>'
 
 class Task(db.Model):
+    __table_args__ = (
+        # Serves the recursive subtask lookups (children of X within a project)
+        db.Index('ix_task_project_parent', 'project_id', 'parent_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -56,10 +69,20 @@ class Task(db.Model):
     creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     assignee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=True)
 
     # Many-to-many relationship with Tag
     tags = db.relationship('Tag', secondary=task_tags, backref='tasks', lazy=True)
 
+    # Subtask hierarchy and dependencies (see app/hierarchy.py for the recursive queries)
+    subtasks = db.relationship('Task', backref=db.backref('parent', remote_side=[id]), lazy=True)
+    blocked_by = db.relationship(
+        'Task', secondary=task_dependencies,
+        primaryjoin=id == task_dependencies.c.blocked_id,
+        secondaryjoin=id == task_dependencies.c.blocker_id,
+        backref='blocks', lazy=True
+    )
+
     def __repr__(self):
         return f'<Task {self.title}>'
 
@@ -69,3 +92,26 @@ class Tag(db.Model):
 
     def __repr__(self):
         return f'<Tag {self.name}>'
+
+class TaskActivity(db.Model):
+    """
+    Append-only field-level change log for tasks.
+    Rows are only ever inserted; the (project_id, id) index keeps each
+    project's history together so the feed is a single range scan.
+    """
+    __tablename__ = 'task_activity'
+    __table_args__ = (
+        db.Index('ix_task_activity_project', 'project_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    task_id = db.Column(db.Integer, nullable=False)  # no FK: history outlives deleted tasks
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    field = db.Column(db.String(20), nullable=False)
+    old_value = db.Column(db.Text, nullable=True)
+    new_value = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TaskActivity {self.task_id}.{self.field}>'
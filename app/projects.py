@@ -3,8 +3,13 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from .database import db
-from .models import Project, Task, Tag, project_members
+from .models import Project, Task, Tag, TaskActivity, project_members
+from .admission import admission
+from .cache import project_list_cache, invalidate_project_members
+from .activity import activity_log
+from .hierarchy import load_tree, unblocked_tasks, creates_dependency_cycle, lock_project_hierarchy
 from datetime import datetime
+from sqlalchemy import func
 
 projects_bp = Blueprint('projects_bp', __name__)
 
@@ -29,36 +34,80 @@ def task_to_dict(t: Task):
         'creator_username': t.creator.username,
         'assignee_id': t.assignee_id,
         'assignee_username': t.assignee.username if t.assignee else None,
-        'tags': [tag.name for tag in t.tags]
+        'tags': [tag.name for tag in t.tags],
+        'parent_id': t.parent_id
     }
 
-# ── Active Projects ───────────────────────────────────────────────
+# ── List Projects ─────────────────────────────────────────────────
+def _project_summaries(user_id, is_completed=None):
+    """
+    The user's projects with member and task counts, in one grouped query.
+    Members themselves are not loaded; use /<id>/members for that.
+    """
+    mine = (
+        db.select(project_members.c.project_id)
+        .where(project_members.c.user_id == user_id)
+    )
+    member_counts = (
+        db.select(project_members.c.project_id, func.count().label('n'))
+        .where(project_members.c.project_id.in_(mine))
+        .group_by(project_members.c.project_id)
+        .subquery()
+    )
+    task_counts = (
+        db.select(Task.project_id, func.count(Task.id).label('n'))
+        .where(Task.project_id.in_(mine))
+        .group_by(Task.project_id)
+        .subquery()
+    )
+    query = (
+        db.select(
+            Project.id, Project.title, Project.join_code, Project.is_completed,
+            func.coalesce(task_counts.c.n, 0).label('task_count'),
+            member_counts.c.n.label('member_count'),
+        )
+        .join(member_counts, member_counts.c.project_id == Project.id)
+        .outerjoin(task_counts, task_counts.c.project_id == Project.id)
+        .order_by(Project.id)
+    )
+    if is_completed is not None:
+        query = query.where(Project.is_completed == is_completed)
+
+    return [
+        {
+            'id': row.id,
+            'title': row.title,
+            'join_code': row.join_code,
+            'is_completed': row.is_completed,
+            'member_count': row.member_count,
+            'task_count': row.task_count,
+        }
+        for row in db.session.execute(query)
+    ]
+
 @projects_bp.route('', methods=['GET'])
 @login_required
 def list_projects():
-    """List all *active* (not completed) projects the current user belongs to."""
-    projs = (
-        Project.query
-        .join(project_members)
-        .filter(project_members.c.user_id == current_user.id)
-        .filter(Project.is_completed == False)
-        .all()
-    )
-    return jsonify([project_to_dict(p) for p in projs]), 200
+    """
+    List the projects the current user belongs to.
+    Optional ?is_completed=true|false narrows to completed or active projects.
+    """
+    flag = request.args.get('is_completed')
+    if flag is None:
+        is_completed = None
+    elif flag.lower() in ('true', '1'):
+        is_completed = True
+    elif flag.lower() in ('false', '0'):
+        is_completed = False
+    else:
+        return jsonify({'message': 'is_completed must be true or false'}), 400
 
-# ── Completed Projects ────────────────────────────────────────────
-@projects_bp.route('/completed', methods=['GET'])
-@login_required
-def list_completed_projects():
-    """List all *completed* projects the current user belongs to."""
-    projs = (
-        Project.query
-        .join(project_members)
-        .filter(project_members.c.user_id == current_user.id)
-        .filter(Project.is_completed == True)
-        .all()
-    )
-    return jsonify([project_to_dict(p) for p in projs]), 200
+    key = 'all' if is_completed is None else str(is_completed).lower()
+    projs, gen = project_list_cache.get(current_user.id, key)
+    if projs is None:
+        projs = _project_summaries(current_user.id, is_completed)
+        project_list_cache.put(current_user.id, key, gen, projs)
+    return jsonify(projs), 200
 
 # ── Create Project ────────────────────────────────────────────────
 @projects_bp.route('', methods=['POST'])
@@ -73,6 +122,7 @@ def create_project():
     p.members.append(current_user)
     db.session.add(p)
     db.session.commit()
+    project_list_cache.invalidate([current_user.id])
 
     return jsonify(project_to_dict(p)), 201
 
@@ -94,6 +144,7 @@ def join_project():
 
     p.members.append(current_user)
     db.session.commit()
+    invalidate_project_members(p.id)
     return jsonify({'message': f'Joined project "{p.title}"'}), 200
 
 # ── Project Members ──────────────────────────────────────────────
@@ -113,6 +164,7 @@ def project_members_list(project_id):
 # ── List Tasks ────────────────────────────────────────────────────
 @projects_bp.route('/<int:project_id>/tasks', methods=['GET'])
 @login_required
+@admission.limit('project_tasks')
 def project_tasks(project_id):
     p = Project.query.get_or_404(project_id)
     if current_user not in p.members:
@@ -120,6 +172,86 @@ def project_tasks(project_id):
 
     return jsonify([task_to_dict(t) for t in p.tasks]), 200
 
+# ── Task Tree ─────────────────────────────────────────────────────
+@projects_bp.route('/<int:project_id>/tasks/tree', methods=['GET'])
+@login_required
+@admission.limit('project_tasks')
+def project_task_tree(project_id):
+    """
+    Subtask hierarchy with roll-up progress and blockers, loaded in one query.
+    Nodes come back flat, ordered by depth; nest them client-side by parent_id.
+    Optional ?root=<task_id> returns just that task's subtree.
+    """
+    p = Project.query.get_or_404(project_id)
+    if current_user not in p.members:
+        return jsonify({'message': 'Forbidden'}), 403
+
+    root_id = request.args.get('root', type=int)
+    tree = load_tree(project_id, root_id)
+    if root_id is not None and not tree:
+        return jsonify({'message': 'Task not found in this project'}), 404
+    return jsonify(tree), 200
+
+# ── Unblocked Tasks ───────────────────────────────────────────────
+@projects_bp.route('/<int:project_id>/tasks/unblocked', methods=['GET'])
+@login_required
+@admission.limit('project_tasks')
+def project_unblocked_tasks(project_id):
+    """Open tasks whose blockers (and their ancestors' blockers) are all completed."""
+    p = Project.query.get_or_404(project_id)
+    if current_user not in p.members:
+        return jsonify({'message': 'Forbidden'}), 403
+
+    return jsonify(unblocked_tasks(project_id)), 200
+
+# ── Task Dependencies ─────────────────────────────────────────────
+@projects_bp.route('/<int:project_id>/tasks/<int:task_id>/dependencies', methods=['POST'])
+@login_required
+def add_task_dependency(project_id, task_id):
+    """Marks the task as blocked by `blocker_id` (another task in the same project)."""
+    p = Project.query.get_or_404(project_id)
+    if current_user not in p.members:
+        return jsonify({'message': 'Forbidden'}), 403
+
+    data = request.get_json() or {}
+    blocker_id = data.get('blocker_id')
+    if blocker_id is None:
+        return jsonify({'message': 'blocker_id required'}), 400
+
+    # Held until commit, so a concurrent request cannot add the reverse edge
+    # between our cycle check and our insert.
+    lock_project_hierarchy(project_id)
+
+    t = Task.query.filter_by(id=task_id, project_id=project_id).first_or_404()
+    blocker = Task.query.filter_by(id=blocker_id, project_id=project_id).first()
+    if not blocker:
+        return jsonify({'message': 'Blocking task not found in this project'}), 400
+    if blocker in t.blocked_by:
+        return jsonify({'message': 'Dependency already exists'}), 200
+    if blocker.id == t.id or creates_dependency_cycle(blocker.id, t.id):
+        db.session.rollback()
+        return jsonify({'message': 'Dependency would create a cycle'}), 409
+
+    t.blocked_by.append(blocker)
+    db.session.commit()
+    return jsonify({'message': 'Dependency added', 'blocked_by': [b.id for b in t.blocked_by]}), 201
+
+@projects_bp.route('/<int:project_id>/tasks/<int:task_id>/dependencies/<int:blocker_id>', methods=['DELETE'])
+@login_required
+def remove_task_dependency(project_id, task_id, blocker_id):
+    p = Project.query.get_or_404(project_id)
+    if current_user not in p.members:
+        return jsonify({'message': 'Forbidden'}), 403
+
+    t = Task.query.filter_by(id=task_id, project_id=project_id).first_or_404()
+    blocker = next((b for b in t.blocked_by if b.id == blocker_id), None)
+    if not blocker:
+        return jsonify({'message': 'Dependency not found'}), 404
+
+    t.blocked_by.remove(blocker)
+    db.session.commit()
+    return jsonify({'message': 'Dependency removed'}), 200
+
 # ── Create Task ───────────────────────────────────────────────────
 @projects_bp.route('/<int:project_id>/tasks', methods=['POST'])
 @login_required
@@ -136,6 +268,12 @@ def create_project_task(project_id):
     due = data.get('due_date')
     due_date = datetime.fromisoformat(due) if due else None
 
+    parent_id = data.get('parent_id')
+    if parent_id is not None:
+        parent = Task.query.filter_by(id=parent_id, project_id=project_id).first()
+        if not parent:
+            return jsonify({'message': 'Parent task not found in this project'}), 400
+
     t = Task(
         title=title,
         description=data.get('description'),
@@ -144,6 +282,7 @@ def create_project_task(project_id):
         creator_id=current_user.id,
         assignee_id=data.get('assignee_id'),
         project_id=project_id,
+        parent_id=parent_id,
         due_date=due_date
     )
     for name in data.get('tags', []):
@@ -153,12 +292,57 @@ def create_project_task(project_id):
 
     db.session.add(t)
     db.session.commit()
+    invalidate_project_members(project_id)
+    activity_log.record(t, None, current_user.id)
 
     return jsonify({
         'message': 'Task created',
         'task': task_to_dict(t)
     }), 201
 
+# ── Activity Feed ─────────────────────────────────────────────────
+@projects_bp.route('/<int:project_id>/activity', methods=['GET'])
+@login_required
+def project_activity(project_id):
+    """
+    Newest-first task activity for a project.
+    Paginate with ?before=<next_before from the previous page>&limit=N (max 200).
+    Entries buffered in other workers can take up to ACTIVITY_FLUSH_INTERVAL to appear.
+    """
+    p = Project.query.get_or_404(project_id)
+    if current_user not in p.members:
+        return jsonify({'message': 'Forbidden'}), 403
+
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        before = request.args.get('before', type=int)
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+
+    # Make this worker's own recent writes visible straight away.
+    activity_log.flush()
+
+    query = TaskActivity.query.filter(TaskActivity.project_id == project_id)
+    if before is not None:
+        query = query.filter(TaskActivity.id < before)
+    entries = query.order_by(TaskActivity.id.desc()).limit(limit).all()
+
+    return jsonify({
+        'entries': [
+            {
+                'id': e.id,
+                'task_id': e.task_id,
+                'user_id': e.user_id,
+                'field': e.field,
+                'old_value': e.old_value,
+                'new_value': e.new_value,
+                'created_at': e.created_at.isoformat(),
+            }
+            for e in entries
+        ],
+        'next_before': entries[-1].id if len(entries) == limit else None,
+    }), 200
+
 # ── Mark Project Completed ────────────────────────────────────────
 @projects_bp.route('/<int:project_id>/complete', methods=['PUT'])
 @login_required
@@ -169,4 +353,5 @@ def complete_project(project_id):
 
     p.is_completed = True
     db.session.commit()
+    invalidate_project_members(project_id)
     return jsonify({'message': 'Project marked completed.'}), 200
@@ -4,6 +4,10 @@ from datetime import datetime
 from sqlalchemy import or_
 from .database import db
 from .models import Task, User, Tag
+from .admission import admission
+from .cache import invalidate_project_members
+from .activity import activity_log, snapshot
+from .hierarchy import creates_parent_cycle, lock_project_hierarchy
 
 # Create a blueprint for task-related routes
 tasks_bp = Blueprint('tasks', __name__)
@@ -23,7 +27,8 @@ def task_to_dict(task):
         'creator_username': task.creator.username,
         'assignee_id': task.assignee_id,
         'assignee_username': task.assignee.username if task.assignee else None,
-        'tags': [tag.name for tag in task.tags]
+        'tags': [tag.name for tag in task.tags],
+        'parent_id': task.parent_id
     }
 
 def user_to_dict(user):
@@ -98,6 +103,7 @@ def create_task():
     db.session.add(new_task)
     db.session.commit()
     db.session.refresh(new_task)
+    activity_log.record(new_task, None, current_user.id)
     return jsonify({'message': 'Task created successfully!', 'task': task_to_dict(new_task)}), 201
 
 @tasks_bp.route('/tasks', methods=['GET'])
@@ -145,6 +151,8 @@ def update_task(task_id):
     if not data:
         return jsonify({'message': 'No data provided for update.'}), 400
 
+    before = snapshot(task)
+
     # Update fields if they are present in the request data
     if 'title' in data:
         task.title = data['title']
@@ -174,6 +182,19 @@ def update_task(task_id):
             task.assignee_id = assignee_id
         else:
             task.assignee_id = None
+
+    if 'parent_id' in data:
+        parent_id = data['parent_id']
+        if parent_id is not None:
+            # Keep the cycle check and the write atomic against concurrent moves.
+            lock_project_hierarchy(task.project_id)
+            parent = Task.query.filter_by(id=parent_id, project_id=task.project_id).first()
+            if not parent:
+                return jsonify({'message': 'Parent task not found in this project.'}), 400
+            if creates_parent_cycle(task.id, parent_id):
+                db.session.rollback()
+                return jsonify({'message': 'Moving the task there would create a cycle (hierarchy or blockers).'}), 409
+        task.parent_id = parent_id
     
     if 'tags' in data:
         new_tag_names = set(data['tags'])
@@ -195,6 +216,7 @@ def update_task(task_id):
 
     db.session.commit()
     db.session.refresh(task)
+    activity_log.record(task, before, current_user.id)
     return jsonify({'message': 'Task updated successfully!', 'task': task_to_dict(task)}), 200
 
 @tasks_bp.route('/tasks/<int:task_id>', methods=['DELETE'])
@@ -213,14 +235,22 @@ def delete_task(task_id):
     if not task:
         return jsonify({'message': 'Task not found or you do not have permission to delete it.'}), 404
     
+    project_id = task.project_id
+    # Subtasks move up to the deleted task's parent; its dependency rows are
+    # removed by the ORM along with it.
+    for child in list(task.subtasks):
+        child.parent = task.parent
     db.session.delete(task)
     db.session.commit()
+    if project_id is not None:
+        invalidate_project_members(project_id)
     return jsonify({'message': 'Task deleted successfully!'}), 200
 
 # --- User & Tag Endpoints ---
 
 @tasks_bp.route('/users', methods=['GET'])
 @login_required
+@admission.limit('users')
 def get_all_users():
     """Retrieves a list of all users."""
     users = User.query.all()
@@ -228,6 +258,7 @@ def get_all_users():
 
 @tasks_bp.route('/users/<int:user_id>/profile', methods=['GET'])
 @login_required
+@admission.limit('user_profile')
 def get_user_profile(user_id):
     """
     Retrieves the profile of a specific user, including tasks
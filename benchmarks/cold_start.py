@@ -0,0 +1,165 @@
+# benchmarks/cold_start.py
+"""
+Cold-start benchmark for the gunicorn deployment.
+
+Boots `gunicorn run:app` against a fresh database exactly as deployed
+(schema creation included in both modes), measures the time until
+the first successful response and the memory of every worker once they
+are all up, then shuts it down. Runs with and without app preloading by
+default so the two can be compared.
+
+    python benchmarks/cold_start.py --workers 4 --runs 3
+    python benchmarks/cold_start.py --mode preload --max-ttfr-ms 1500 --max-rss-mb 80
+
+Exits non-zero when a --max-* threshold is exceeded, so it can gate CI.
+Linux only: worker memory is read from /proc.
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    """PIDs whose parent is `pid`."""
+    kids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; ppid follows the last ')'.
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            kids.append(int(entry))
+    return kids
+
+
+def memory_kb(pid):
+    """(RSS, PSS) in kB. PSS splits copy-on-write pages shared with the master."""
+    rss = pss = None
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, pss
+
+
+def run_once(preload, workers, timeout):
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            SKIP_SCHEMA_CHECK='0',
+            PRELOAD='1' if preload else '0',
+            DATABASE_URL='sqlite:///' + os.path.join(tmp, 'site.db'),
+            ADMISSION_STORE=os.path.join(tmp, 'admission.db'),
+            PROJECT_CACHE_STORE=os.path.join(tmp, 'cache.db'),
+        )
+        url = f'http://127.0.0.1:{port}/auth/status'
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'run:app',
+             '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            ttfr = None
+            while time.perf_counter() - start < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f'gunicorn exited with {proc.returncode}')
+                try:
+                    with urllib.request.urlopen(url, timeout=1) as resp:
+                        if resp.status == 200:
+                            ttfr = time.perf_counter() - start
+                            break
+                except OSError:
+                    time.sleep(0.01)
+            if ttfr is None:
+                raise RuntimeError(f'no response within {timeout}s')
+
+            # Give the remaining workers time to finish booting before sampling.
+            pids = children(proc.pid)
+            while len(pids) < workers and time.perf_counter() - start < timeout:
+                time.sleep(0.05)
+                pids = children(proc.pid)
+            time.sleep(0.5)
+            mem = [memory_kb(pid) for pid in children(proc.pid)]
+            if proc.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with {proc.returncode} while workers were booting')
+            if len(mem) != workers:
+                raise RuntimeError(f'expected {workers} workers, found {len(mem)}')
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    return {
+        'ttfr_ms': ttfr * 1000,
+        'rss_mb': [rss / 1024 for rss, _ in mem],
+        'pss_mb': [pss / 1024 for _, pss in mem if pss is not None],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--mode', choices=('preload', 'no-preload', 'both'), default='both')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--max-ttfr-ms', type=float, help='fail if median time-to-first-response exceeds this')
+    parser.add_argument('--max-rss-mb', type=float, help='fail if any worker RSS exceeds this')
+    args = parser.parse_args()
+
+    modes = {'preload': [True], 'no-preload': [False], 'both': [False, True]}[args.mode]
+    failed = False
+    for preload in modes:
+        results = [run_once(preload, args.workers, args.timeout) for _ in range(args.runs)]
+        ttfr = statistics.median(r['ttfr_ms'] for r in results)
+        rss = [m for r in results for m in r['rss_mb']]
+        pss = [m for r in results for m in r['pss_mb']]
+
+        label = 'preload' if preload else 'no-preload'
+        print(f'{label:<11} workers={args.workers} runs={args.runs}  '
+              f'ttfr median={ttfr:7.1f} ms  min={min(r["ttfr_ms"] for r in results):7.1f} ms  '
+              f'worker rss max={max(rss):6.1f} MB'
+              + (f'  worker pss mean={statistics.mean(pss):6.1f} MB' if pss else ''))
+
+        if args.max_ttfr_ms is not None and ttfr > args.max_ttfr_ms:
+            print(f'  FAIL: median ttfr {ttfr:.1f} ms > {args.max_ttfr_ms} ms')
+            failed = True
+        if args.max_rss_mb is not None and max(rss) > args.max_rss_mb:
+            print(f'  FAIL: worker rss {max(rss):.1f} MB > {args.max_rss_mb} MB')
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn run:app` (see Procfile). Bind address
+# and worker count keep gunicorn's defaults (PORT / WEB_CONCURRENCY).
+import os
+import sys
+import subprocess
+
+# Preload: the master imports run.py, builds the app and checks the schema
+# once, then forks workers that share those pages copy-on-write instead of
+# each repeating the work. Set PRELOAD=0 to go back to per-worker startup.
+preload_app = os.environ.get('PRELOAD', '1') != '0'
+
+
+def on_starting(server):
+    # Without preload every worker would run db.create_all() at once, and on
+    # a fresh SQLite file the losers fail with "table already exists" and
+    # take the server down. Create the schema once before forking instead,
+    # in a subprocess so the master stays free of app imports, and let the
+    # workers skip the check. (With preload the master already did it.)
+    if not preload_app and os.environ.get('SKIP_SCHEMA_CHECK') != '1':
+        subprocess.run(
+            [sys.executable, '-c', 'from app import create_app; create_app()'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        )
+        os.environ['SKIP_SCHEMA_CHECK'] = '1'
+
+
+def post_fork(server, worker):
+    # Pooled DB connections opened in the master must not be shared with
+    # the children; drop them without closing so the master's stay usable.
+    if preload_app:
+        from app.database import db
+        app = server.app.wsgi()
+        with app.app_context():
+            db.engine.dispose(close=False)
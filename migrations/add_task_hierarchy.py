@@ -0,0 +1,17 @@
+# migrations/add_task_hierarchy.py
+from app import create_app, db
+from sqlalchemy import text
+
+app = create_app()
+
+with app.app_context():
+    # create_all() has already added the task_dependencies table; only the
+    # new column and index on the existing task table need adding by hand.
+    cols = [row[1] for row in db.session.execute(text("PRAGMA table_info(task);")).fetchall()]
+    if "parent_id" in cols:
+        print("⚠️  parent_id already present, nothing to do.")
+    else:
+        db.session.execute(text('ALTER TABLE task ADD COLUMN parent_id INTEGER REFERENCES task(id);'))
+        db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_task_project_parent ON task (project_id, parent_id);'))
+        db.session.commit()
+        print("✅ parent_id column and index added.")
@@ -165,7 +165,7 @@ function App() {
   // --- Project Management ---
   const fetchProjects = useCallback(async () => {
     try {
-      const response = await fetch(`${API_BASE_URL}/api/projects`, {
+      const response = await fetch(`${API_BASE_URL}/api/projects?is_completed=false`, {
         credentials: 'include'             // ← send cookies
       });
       if (response.ok) {
@@ -182,7 +182,7 @@ function App() {
   const fetchCompletedProjects = useCallback(async () => {
     try {
       const res = await fetch(
-        `${API_BASE_URL}/api/projects/completed`,
+        `${API_BASE_URL}/api/projects?is_completed=true`,
         { credentials: 'include' }
       );
       if (res.ok) {
@@ -574,7 +574,7 @@ const renderProjectSelection = () => {
               >
                 <h3 className="text-xl font-bold text-indigo-800">{project.title}</h3>
                 <p className="text-sm text-gray-600 mt-2">
-                  Members: {project.members.length}
+                  Members: {project.member_count}
                 </p>
               </div>
             ))
@@ -596,7 +596,7 @@ const renderProjectSelection = () => {
               >
                 <h3 className="text-xl font-bold text-gray-800">{proj.title}</h3>
                 <p className="text-sm text-gray-600 mt-2">
-                  Members: {proj.members.length}
+                  Members: {proj.member_count}
                 </p>
               </div>
             ))}